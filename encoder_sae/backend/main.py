@@ -206,11 +206,13 @@ def generate_heatmap(input_data: dict):
         embeddings.append(embedding)
 
     # 3. Get feature activations
+    # Run every sentence through the SAE in a single batch
     feature_activations = []
-    for embedding in embeddings:
-        embedding_tensor = torch.tensor(embedding)
-        activation = sae_model.forward(embedding_tensor)[1]
-        feature_activations.append(activation[:first_n_features].tolist())
+    if embeddings:
+        embeddings_tensor = torch.tensor(embeddings, dtype=torch.float32)
+        feature_activations = sae_model.forward(embeddings_tensor)[1][
+            :, :first_n_features
+        ].tolist()
 
     # 4. Prepare output
     output = []
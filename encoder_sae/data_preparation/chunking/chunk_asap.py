@@ -9,6 +9,8 @@ import pandas as pd
 
 nltk.download("punkt", quiet=True)
 
+WRITE_BUFFER_SIZE = 8 * 1024 * 1024
+
 
 def chunk_asap(set_ids):
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -18,7 +20,13 @@ def chunk_asap(set_ids):
 
     # Iterate through each set_id
     for set_id in set_ids:
-        with open(output_file, mode="w", newline="", encoding="utf-8") as file:
+        with open(
+            output_file,
+            mode="w",
+            newline="",
+            encoding="utf-8",
+            buffering=WRITE_BUFFER_SIZE,
+        ) as file:
             writer = csv.writer(file)
             writer.writerow(["sentence"])  # Write header
 
@@ -29,9 +37,8 @@ def chunk_asap(set_ids):
             for essay in df["CorrectedSpellingEssayText"]:
                 # Tokenize the essay into sentences
                 sentences = sent_tokenize(essay)
-                # Add these sentences to our list
-                for sentence in sentences:
-                    writer.writerow([sentence])
+                # Write all of the essay's sentences in one call
+                writer.writerows([sentence] for sentence in sentences)
 
         print(f"Chunking complete. Output saved to {output_file}")
 
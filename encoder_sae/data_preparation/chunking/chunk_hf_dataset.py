@@ -3,6 +3,9 @@ import argparse
 import csv
 import os
 import pandas as pd
+from contextlib import ExitStack
+from itertools import islice
+from multiprocessing import Pool
 from datetime import datetime
 from nltk.tokenize import sent_tokenize
 from datasets import load_dataset
@@ -11,6 +14,28 @@ from tqdm import tqdm
 nltk.download("punkt", quiet=True)
 nltk.download("punkt_tab", quiet=True)
 
+# Rows are handed to the csv writer in batches through a large file buffer
+WRITE_BUFFER_SIZE = 8 * 1024 * 1024
+ROWS_PER_WRITE = 10_000
+TOKENIZE_CHUNKSIZE = 256
+
+
+def sentence_chunks(item):
+    text, label = item
+    return sent_tokenize(text), label
+
+
+def item_chunks(item):
+    text, label = item
+    return [text], label
+
+
+def tokenize_in_windows(pool, items, window_size):
+    # Pool.imap reads its whole input up front, so feed it a bounded window at a
+    # time to keep streamed datasets from piling up in memory
+    items = iter(items)
+    while window := list(islice(items, window_size)):
+        yield from pool.imap(sentence_chunks, window, chunksize=TOKENIZE_CHUNKSIZE)
 
 
 def chunk_dataset(input_source, num_chunks=None, chunk_type="sentence", text_column=None):
@@ -18,12 +43,13 @@ def chunk_dataset(input_source, num_chunks=None, chunk_type="sentence", text_col
         df = pd.read_csv(input_source)
         if text_column is None:
             raise ValueError("text_column must be specified for CSV input")
-        texts = df[text_column].tolist()
-        labels = df["label"].tolist()
+        items = zip(df[text_column].tolist(), df["label"].tolist())
+        total_items = len(df)
     else:
-        ds = load_dataset(input_source)
-        texts = ds["train"]["text"]
-        labels = ds["train"]["label"]
+        # Stream the records instead of materializing the whole text column
+        ds = load_dataset(input_source, split="train", streaming=True)
+        items = ((example["text"], example.get("label")) for example in ds)
+        total_items = None
 
     num_written = 0
 
@@ -34,20 +60,37 @@ def chunk_dataset(input_source, num_chunks=None, chunk_type="sentence", text_col
         output_dir, f"{os.path.basename(input_source).split('.')[0]}_{timestamp}.csv"
     )
 
-    with open(output_file, mode="w", newline="", encoding="utf-8") as file:
+    with ExitStack() as stack:
+        file = stack.enter_context(
+            open(
+                output_file,
+                mode="w",
+                newline="",
+                encoding="utf-8",
+                buffering=WRITE_BUFFER_SIZE,
+            )
+        )
         writer = csv.writer(file)
         writer.writerow(["sentence", "label"])  # Write header
 
-        total_items = len(texts)
-        for idx, text in enumerate(tqdm(texts, total=total_items, desc="Processing chunks")):
-            if chunk_type == "sentence":
-                chunks = sent_tokenize(text)
-            else:  # per item
-                chunks = [text]
-            
+        if chunk_type == "sentence":
+            # Punkt is pure Python, so split sentences on every core; imap keeps
+            # the input order so the --num_chunks cut-off is deterministic
+            pool = stack.enter_context(Pool(os.cpu_count()))
+            chunked_items = tokenize_in_windows(
+                pool, items, os.cpu_count() * TOKENIZE_CHUNKSIZE * 4
+            )
+        else:  # per item
+            chunked_items = map(item_chunks, items)
+
+        rows = []
+        for chunks, label in tqdm(chunked_items, total=total_items, desc="Processing chunks"):
             for chunk in chunks:
                 num_written += 1
-                writer.writerow([chunk, labels[idx]])
+                rows.append([chunk, label])
+                if len(rows) >= ROWS_PER_WRITE:
+                    writer.writerows(rows)
+                    rows.clear()
 
                 if num_chunks is not None and num_written >= num_chunks:
                     print(f"Reached the limit of {num_chunks} chunks")
@@ -55,6 +98,8 @@ def chunk_dataset(input_source, num_chunks=None, chunk_type="sentence", text_col
             if num_chunks is not None and num_written >= num_chunks:
                 break
 
+        writer.writerows(rows)
+
     print(f"Chunking complete. Output saved to {output_file}")
 
 
@@ -20,6 +20,10 @@ import torch.nn.functional as F
 from tqdm import tqdm
 from transformers import AutoTokenizer, AutoModelForCausalLM
 
+# Embeddings are stored in half precision and memory-mapped by readers, which
+# cast each batch back to float32 as it is loaded
+EMBEDDING_DTYPE = np.float16
+
 
 class BottleneckT5Autoencoder:
     def __init__(self, model_path: str, device="cpu"):
@@ -162,13 +166,14 @@ def embed_chunks(
         if (i // batch_size + 1) % checkpoint_interval == 0:
             np.save(
                 os.path.join(embedded_chunks_dir, "embeddings_checkpoint.npy"),
-                np.array(all_embeddings),
+                np.array(all_embeddings, dtype=EMBEDDING_DTYPE),
             )
             progress_bar.write(f"Checkpoint saved at batch {i // batch_size + 1}")
 
     # Save all embeddings and sentences to .npy files
     np.save(
-        os.path.join(embedded_chunks_dir, "embeddings.npy"), np.array(all_embeddings)
+        os.path.join(embedded_chunks_dir, "embeddings.npy"),
+        np.array(all_embeddings, dtype=EMBEDDING_DTYPE),
     )
 
     # Save config of the dataset
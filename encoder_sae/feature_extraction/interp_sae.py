@@ -1,4 +1,6 @@
 import numpy as np
+import torch
+import torch.distributed as dist
 
 import os
 import json
@@ -34,6 +36,9 @@ def interp_sae(
     feature_registry_path=None,
     prompt_type="default",
     k=50,
+    activations_path=None,
+    min_density=1e-5,
+    max_density=0.3,
 ):
     # Start wandb run
     # wandb.init(
@@ -53,6 +58,20 @@ def interp_sae(
     # )
 
     TIMESTAMP = datetime.now().strftime("%Y%m%d_%H%M%S")
+    device = None
+
+    # When launched with torchrun, split the features across one process per GPU
+    if int(os.environ.get("WORLD_SIZE", 1)) > 1:
+        local_rank = int(os.environ["LOCAL_RANK"])
+        torch.cuda.set_device(local_rank)
+        device = f"cuda:{local_rank}"
+        dist.init_process_group(backend="nccl")
+
+        # Every rank has to agree on the output folder
+        timestamp = [TIMESTAMP]
+        dist.broadcast_object_list(timestamp, src=0)
+        TIMESTAMP = timestamp[0]
+
     OUTPUT_DIR = os.path.join(features_base_path, TIMESTAMP)
 
     # load dataset
@@ -101,8 +120,15 @@ def interp_sae(
         feature_registry_path=feature_registry_path,
         prompt_type=prompt_type,
         k=k,
+        activations_path=activations_path,
+        device=device,
+        min_density=min_density,
+        max_density=max_density,
     )
 
+    if dist.is_initialized():
+        dist.destroy_process_group()
+
     # wandb.log_artifact(artifact)
     # wandb.finish()
 
@@ -162,6 +188,24 @@ if __name__ == "__main__":
         default=50,
         help="Number of high and low activating samples to use",
     )
+    parser.add_argument(
+        "--activations_path",
+        type=str,
+        default=None,
+        help="Optional path to save all feature activations as a sparse CSR matrix",
+    )
+    parser.add_argument(
+        "--min_density",
+        type=float,
+        default=1e-5,
+        help="Skip features that activate on at most this fraction of samples",
+    )
+    parser.add_argument(
+        "--max_density",
+        type=float,
+        default=0.3,
+        help="Skip features that activate on at least this fraction of samples",
+    )
     args = parser.parse_args()
     interp_sae(
         sentences_file=args.sentences_file,
@@ -173,4 +217,7 @@ if __name__ == "__main__":
         feature_registry_path=args.feature_registry_path,
         prompt_type=args.prompt_type,
         k=args.k,
+        activations_path=args.activations_path,
+        min_density=args.min_density,
+        max_density=args.max_density,
     )
@@ -45,6 +45,6 @@ python feature_extraction/interp_sae.py \
     --features_base_path "feature_extraction/features" \
     --max_features 200 \
     --model "gpt-4o" \
-    # --feature_registry_path "feature_extraction/features/20241203_014216/feature_registry.npy" \
+    # --feature_registry_path "feature_extraction/features/20241203_014216/feature_registry.npz" \
     --prompt_type "default" \
     --k 50
\ No newline at end of file
@@ -7,4 +7,4 @@ python feature_extraction/interp_sae.py \
     --features_base_path "feature_extraction/features" \
     --max_features 50 \
     --model "gpt-4o-mini" \
-    --feature_registry_path "feature_extraction/features/feature_registry.npy"
\ No newline at end of file
+    --feature_registry_path "feature_extraction/features/feature_registry.npz"
\ No newline at end of file
@@ -1,17 +1,34 @@
 from shared.prompts import get_prompt_by_type, score_prompt
-from openai import OpenAI
+from openai import DefaultHttpxClient, OpenAI
+import httpx
 import json
+import threading
 import tiktoken
 
 
 class OpenAIClient:
-    def __init__(self, api_key, model="gpt-4o-mini"):
-        self.client = OpenAI(api_key=api_key)
+    def __init__(self, api_key, model="gpt-4o-mini", max_connections=100):
+        # One pooled HTTP/2 client for every call, sized for concurrent requests, so
+        # connections and TLS sessions are reused instead of renegotiated. The SDK's
+        # client class keeps its default timeout and redirect handling
+        http_client = DefaultHttpxClient(
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        )
+        self.client = OpenAI(api_key=api_key, http_client=http_client)
         self.encoder = tiktoken.get_encoding("cl100k_base")  # Use cl100k_base encoding which works with GPT-4
         self.total_prompt_tokens = 0
         self.total_completion_tokens = 0
         self.total_cost = 0
         self.model = model
+        # Calls may be made from several threads at once
+        self._lock = threading.Lock()
+
+    def close(self):
+        self.client.close()
 
     def get_interpretation(self, positive_samples, negative_samples, prompt_type):
         prompt = get_prompt_by_type(positive_samples, negative_samples, prompt_type)
@@ -31,9 +48,12 @@ class OpenAIClient:
             ],
         )
 
-        self.total_prompt_tokens += response.usage.prompt_tokens
-        self.total_completion_tokens += response.usage.completion_tokens
-        self.update_cost(response.usage.prompt_tokens, response.usage.completion_tokens)
+        with self._lock:
+            self.total_prompt_tokens += response.usage.prompt_tokens
+            self.total_completion_tokens += response.usage.completion_tokens
+            self.update_cost(
+                response.usage.prompt_tokens, response.usage.completion_tokens
+            )
 
         return json.loads(response.choices[0].message.content)
 
@@ -55,9 +75,12 @@ class OpenAIClient:
             ],
         )
 
-        self.total_prompt_tokens += response.usage.prompt_tokens
-        self.total_completion_tokens += response.usage.completion_tokens
-        self.update_cost(response.usage.prompt_tokens, response.usage.completion_tokens)
+        with self._lock:
+            self.total_prompt_tokens += response.usage.prompt_tokens
+            self.total_completion_tokens += response.usage.completion_tokens
+            self.update_cost(
+                response.usage.prompt_tokens, response.usage.completion_tokens
+            )
 
         return json.loads(response.choices[0].message.content)
 
@@ -1,13 +1,33 @@
+from dataclasses import dataclass
 from pydantic import BaseModel
 from pydantic import Field
 import torch
 from typing import Union
 
 
-class FeatureSample(BaseModel):
+# A plain slotted dataclass rather than a model keeps the thousands of samples
+# held per labelling run small; pydantic still serializes them as fields of
+# Feature. Slots are declared by hand because dataclass(slots=True) needs Python 3.10
+@dataclass(frozen=True, eq=False)
+class FeatureSample:
+    __slots__ = ("text", "act")
+
     text: str
     act: float
 
+    # Coerce like the pydantic model did, so numpy scalars still serialize to JSON
+    def __post_init__(self):
+        object.__setattr__(self, "text", str(self.text))
+        object.__setattr__(self, "act", float(self.act))
+
+    # Frozen instances reject the setattr pickle uses to restore slots
+    def __getstate__(self):
+        return (self.text, self.act)
+
+    def __setstate__(self, state):
+        object.__setattr__(self, "text", state[0])
+        object.__setattr__(self, "act", state[1])
+
     def __eq__(self, other):
         if not isinstance(other, FeatureSample):
             return False
@@ -16,10 +36,6 @@ class FeatureSample(BaseModel):
     def __hash__(self):
         return hash((self.text))
 
-    class Config:
-        allow_mutation = True
-        frozen = False
-
 
 class Feature(BaseModel):
     index: int
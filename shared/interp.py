@@ -18,6 +18,11 @@ Usage:
         - n_feature_activations: Number of feature activations to consider.
         - handle_labelled_feature: A callback function to handle the labelled feature.
         - feature_registry_path: Optional path to a pre-computed feature registry file.
+        - activations_path: Optional path to also save every feature activation as a
+                            sparse (n_feature_activations, n) CSR matrix.
+    3. If a torch.distributed process group is initialized (e.g. under torchrun), each
+       rank builds the registry for every world_size-th feature and labels its share of
+       the top ranked features. Only rank 0 calls handle_labelled_feature.
 
 Example:
     from shared.sparse_autoencoder import SparseAutoencoder, SparseAutoencoderConfig
@@ -46,20 +51,28 @@ Example:
         mini_pile_dataset.sentences,
         6144 (usually n_dimensions * 8),
         handle_labelled_feature,
-        feature_registry_path="path_to_feature_registry.npy"
+        feature_registry_path="path_to_feature_registry.npz"
     )
 """
 
 import torch
-from collections import defaultdict
+import torch.distributed as dist
+import torch.nn.functional as F
 import matplotlib.pyplot as plt
 import numpy as np
+import pandas as pd
+import scipy.sparse as sp
 
 from shared.ai import OpenAIClient
-from shared.sparse_autoencoder import SparseAutoencoder, SparseAutoencoderConfig
+from shared.sparse_autoencoder import (
+    SparseAutoencoder,
+    SparseAutoencoderConfig,
+    SparseAutoencoderType,
+)
 from dotenv import load_dotenv
 from shared.features import Feature, FeatureSample
-from shared.models import MiniPileDataset
+from shared.models import EmbeddingBatches, MiniPileDataset
+from torch.utils.data import DataLoader
 import tqdm
 import os
 
@@ -68,7 +81,8 @@ import ipywidgets as widgets
 from IPython.display import display, HTML
 import matplotlib.colors as mcolors
 import re
-from heapq import nlargest
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 
 # Load environment variables from .env file
@@ -78,6 +92,264 @@ load_dotenv()
 openai_api_key = os.getenv("OPENAI_API_KEY")
 
 
+def _default_device():
+    return "cuda:0" if torch.cuda.is_available() else "cpu"
+
+
+def _iter_feature_activations(
+    sae, embeddings, batch_size, device, num_workers, compile_sae=False, features=None
+):
+    """
+    Yield (start, end, float32 feature activations) for consecutive embedding batches,
+    restricted to the feature columns in `features` if given.
+    """
+    use_cuda = torch.device(device).type == "cuda"
+
+    # Worker processes slice and convert the next batches while the SAE runs, and
+    # pinned memory lets the host to device copy overlap with compute
+    loader = DataLoader(
+        EmbeddingBatches(embeddings, batch_size),
+        batch_size=None,
+        num_workers=num_workers,
+        pin_memory=use_cuda,
+    )
+
+    # Specialize the forward pass to a fixed (batch_size, d_model) input and replay
+    # it as a CUDA graph; the last batch is padded so the shape never changes
+    compiled = compile_sae and use_cuda
+    forward = sae.forward
+    if compiled:
+        forward = torch.compile(
+            sae.forward, mode="reduce-overhead", fullgraph=True, dynamic=False
+        )
+
+    # The SAE runs on `device` in eval mode, but the caller's model is handed back
+    # on its original device and with its original training flag
+    original_device = next(sae.parameters()).device
+    was_training = sae.training
+    sae.to(device).eval()
+    try:
+        start = 0
+        for batch in loader:
+            n_rows = len(batch)
+            end = start + n_rows
+            batch = batch.to(device, non_blocking=True)
+            if compiled:
+                batch = F.pad(batch, (0, 0, 0, batch_size - n_rows))
+                torch.compiler.cudagraph_mark_step_begin()
+
+            # Run the encoder matmul in bfloat16 on the GPU, but hand back float32
+            with torch.inference_mode(), torch.autocast(
+                device_type="cuda", dtype=torch.bfloat16, enabled=use_cuda
+            ):
+                feature_activations = forward(batch)[1][:n_rows].float()
+                if features is not None:
+                    feature_activations = feature_activations[:, features]
+            if compiled:
+                # The CUDA graph writes every replay into the same output buffer
+                feature_activations = feature_activations.clone()
+            yield start, end, feature_activations
+            start = end
+    finally:
+        sae.to(original_device).train(was_training)
+
+
+def _rank_and_world_size():
+    if dist.is_available() and dist.is_initialized():
+        return dist.get_rank(), dist.get_world_size()
+    return 0, 1
+
+
+def _global_feature_ranking(feature_indices, non_zero_counts):
+    """Rank the features of every rank together, as a single process would."""
+    shards = [None] * dist.get_world_size()
+    dist.all_gather_object(shards, (feature_indices, non_zero_counts))
+    feature_indices = np.concatenate([indices for indices, _ in shards])
+    non_zero_counts = np.concatenate([counts for _, counts in shards])
+
+    # Most active first, ties broken by feature index like the stable argsort
+    return feature_indices[np.lexsort((feature_indices, -non_zero_counts))]
+
+
+FEATURE_REGISTRY_KEYS = (
+    "top_acts",
+    "top_idx",
+    "zero_idx",
+    "non_zero_counts",
+    "n_samples",
+    "feature_indices",
+)
+
+
+def _check_feature_registry(path, k):
+    """Fail early if a cached registry can't serve a run with k samples per feature."""
+    # Registries used to be a raw memmap of the full activation matrix
+    if not zipfile.is_zipfile(path):
+        raise ValueError(
+            f"{path} is not a feature registry .npz file. Registries saved as a raw "
+            "activation memmap by older versions are no longer supported; pass a "
+            "new feature_registry_path to rebuild it"
+        )
+
+    with np.load(path) as feature_registry:
+        missing = [key for key in FEATURE_REGISTRY_KEYS if key not in feature_registry]
+        if missing:
+            raise ValueError(
+                f"Feature registry {path} is missing {', '.join(missing)}; pass a "
+                "new feature_registry_path to rebuild it"
+            )
+        registry_k = feature_registry["top_acts"].shape[1]
+
+    if registry_k < k:
+        raise ValueError(
+            f"Feature registry {path} keeps {registry_k} samples per feature, fewer "
+            f"than k={k}; lower k or pass a new feature_registry_path to rebuild it"
+        )
+
+
+def _rank_path(path, rank, world_size):
+    root, ext = os.path.splitext(path)
+    return f"{root}.rank{rank}of{world_size}{ext}"
+
+
+# Random candidates drawn per feature for its k zero activation samples
+ZERO_CANDIDATE_FACTOR = 8
+
+
+def _merge_top_k(values, indices, new_values, new_indices, k):
+    """Keep the k largest values, and their sample indices, in every feature row."""
+    values, keep = torch.cat([values, new_values], dim=1).topk(k, dim=1)
+    return values, torch.cat([indices, new_indices], dim=1).gather(1, keep)
+
+
+def _build_feature_registry(
+    sae,
+    embeddings,
+    text_data,
+    n_feature_activations,
+    k,
+    batch_size,
+    device,
+    num_workers,
+    keep_activations=False,
+    compile_sae=False,
+    features=None,
+):
+    """
+    Stream the embeddings through the SAE and keep, for every feature, only what the
+    interpretation step needs: its k highest activating samples, a uniform sample of
+    k samples on which it is zero, and its number of non-zero activations.
+
+    With keep_activations, every non-zero activation is also collected into a sparse
+    (n_feature_activations, n) CSR matrix, which is returned alongside the registry.
+
+    If `features` is given, only those n_feature_activations columns of the SAE's
+    output are registered.
+    """
+    n = len(embeddings)
+
+    # Duplicate sentences share an activation, so only the first occurrence of a
+    # sentence is eligible as a high or low activating sample
+    is_duplicate = torch.tensor(
+        pd.Series(text_data).duplicated().to_numpy(), device=device
+    )
+
+    # Everything is kept on the SAE's device, so the full activation matrix never
+    # reaches host memory. The top k activations per feature:
+    top_acts = torch.zeros((n_feature_activations, k), device=device)
+    top_idx = torch.full((n_feature_activations, k), -1, device=device)
+    non_zero_counts = torch.zeros(
+        n_feature_activations, dtype=torch.int64, device=device
+    )
+
+    # Zero activation samples are drawn in index space: every feature gets a random
+    # set of candidate samples up front, and the first k of them that turn out to
+    # be zero for it are kept
+    rng = np.random.default_rng()
+    n_candidates = min(n, ZERO_CANDIDATE_FACTOR * k)
+    zero_candidates = torch.from_numpy(
+        np.stack(
+            [
+                rng.choice(n, size=n_candidates, replace=False)
+                for _ in range(n_feature_activations)
+            ]
+        )
+    ).to(device)
+    zero_eligible = ~is_duplicate[zero_candidates]
+    is_zero = torch.zeros_like(zero_eligible)
+
+    # Sparse (batch, feature) blocks of the activations, if they are being kept
+    activation_blocks = []
+
+    for start, end, feature_activations in tqdm.tqdm(
+        _iter_feature_activations(
+            sae, embeddings, batch_size, device, num_workers, compile_sae, features
+        ),
+        total=-(-n // batch_size),
+        desc="Creating feature registry",
+    ):
+        duplicate = is_duplicate[start:end, None]
+        rows = torch.arange(start, end, device=device).expand(
+            n_feature_activations, -1
+        )
+
+        # One pass over the activations serves both the counts and the zero sampling
+        non_zero = feature_activations != 0
+        non_zero_counts += non_zero.sum(dim=0)
+
+        if keep_activations:
+            batch_rows, batch_cols = non_zero.nonzero(as_tuple=True)
+            activation_blocks.append(
+                sp.csr_matrix(
+                    (
+                        feature_activations[batch_rows, batch_cols].cpu().numpy(),
+                        (batch_rows.cpu().numpy(), batch_cols.cpu().numpy()),
+                    ),
+                    shape=(end - start, n_feature_activations),
+                )
+            )
+
+        top_acts, top_idx = _merge_top_k(
+            top_acts,
+            top_idx,
+            feature_activations.masked_fill(duplicate, 0).T,
+            rows,
+            k,
+        )
+
+        # Look up whichever zero candidates fall inside this batch
+        in_batch = (zero_candidates >= start) & (zero_candidates < end)
+        candidate_non_zero = non_zero.T.gather(
+            1, (zero_candidates - start).clamp(0, end - start - 1)
+        )
+        is_zero |= in_batch & ~candidate_non_zero
+
+    # Slots that never saw an eligible sample point nowhere
+    top_idx[top_acts <= 0] = -1
+
+    # Keep the first k eligible zero candidates of every feature
+    is_zero &= zero_eligible
+    slots = is_zero.cumsum(dim=1) - 1
+    keep = is_zero & (slots < k)
+    zero_idx = torch.full((n_feature_activations, k), -1, device=device)
+    zero_idx[keep.nonzero()[:, 0], slots[keep]] = zero_candidates[keep]
+
+    feature_registry = {
+        "top_acts": top_acts.cpu().numpy(),
+        "top_idx": top_idx.cpu().numpy(),
+        "zero_idx": zero_idx.cpu().numpy(),
+        "non_zero_counts": non_zero_counts.cpu().numpy(),
+        "n_samples": n,
+    }
+
+    activations = None
+    if keep_activations:
+        # Stacked by sample, then transposed so each row holds one feature
+        activations = sp.vstack(activation_blocks, format="csr").T.tocsr()
+
+    return feature_registry, activations
+
+
 def run_interp_pipeline(
     sae,
     embeddings,
@@ -90,86 +362,135 @@ def run_interp_pipeline(
     feature_registry_path=None,
     prompt_type="default",
     k=50, # for high and low activating samples
+    batch_size=4096, # for building the feature registry
+    device=None,
+    concurrency=64, # number of features being labelled at once
+    num_workers=4, # for loading embeddings
+    activations_path=None,
+    compile_sae=True, # only takes effect on CUDA
+    min_density=1e-5, # features outside (min_density, max_density) are not labelled
+    max_density=0.3,
 ):
-    ai = OpenAIClient(openai_api_key, model=model)
-
-    n = len(embeddings)
+    if device is None:
+        device = _default_device()
 
     # Use the provided feature_registry_path if given, otherwise create one in output_dir
     if feature_registry_path is None:
-        feature_registry_path = os.path.join(output_dir, "feature_registry.npy")
-
-    if not os.path.exists(feature_registry_path):
-        print("Creating feature registry")
+        feature_registry_path = os.path.join(output_dir, "feature_registry.npz")
+
+    # Under torch.distributed each rank owns every world_size-th feature
+    rank, world_size = _rank_and_world_size()
+    feature_indices = np.arange(rank, n_feature_activations, world_size)
+    if world_size > 1:
+        feature_registry_path = _rank_path(feature_registry_path, rank, world_size)
+        if activations_path is not None:
+            activations_path = _rank_path(activations_path, rank, world_size)
+
+    build_registry = not os.path.exists(feature_registry_path)
+    if not build_registry:
+        _check_feature_registry(feature_registry_path, k)
+    build_activations = activations_path is not None and not os.path.exists(
+        activations_path
+    )
+    registry_sae, registry_features = sae, None
+    if world_size > 1:
+        if sae.config.sae_type == SparseAutoencoderType.BASIC:
+            registry_sae = sae.select_features(feature_indices)
+        else:
+            # TopK activations depend on every feature, so each rank runs the full
+            # SAE and keeps only its own columns
+            registry_features = torch.as_tensor(feature_indices, device=device)
 
-        # Create a memory-mapped file for the feature registry
-        feature_registry = np.memmap(
-            feature_registry_path,
-            dtype="float32",
-            mode="w+",
-            shape=(n_feature_activations, n),
+    if build_registry or build_activations:
+        if build_registry:
+            print("Creating feature registry")
+        else:
+            print(f"Computing feature activations for {activations_path}")
+        feature_registry, activations = _build_feature_registry(
+            registry_sae,
+            embeddings,
+            text_data,
+            len(feature_indices),
+            k,
+            batch_size,
+            device,
+            num_workers,
+            keep_activations=build_activations,
+            compile_sae=compile_sae,
+            features=registry_features,
         )
+        feature_registry["feature_indices"] = feature_indices
 
-        for i in tqdm.tqdm(range(n), desc="Creating feature registry"):
-            embedding = torch.tensor(embeddings[i])
-            feature_activations = sae.forward(embedding)[1]
-            feature_registry[:, i] = feature_activations.detach().numpy()
+        # Write through file handles so numpy/scipy don't append their own extension.
+        # An existing registry is kept as is, since its zero samples are random
+        if build_registry:
+            with open(feature_registry_path, "wb") as f:
+                np.savez(f, **feature_registry)
+            print(f"Feature registry saved to {feature_registry_path}")
 
-            # Flush changes to disk every 1000 iterations
-            if (i + 1) % 1000 == 0:
-                feature_registry.flush()
+        if build_activations:
+            with open(activations_path, "wb") as f:
+                sp.save_npz(f, activations)
+            print(f"Sparse feature activations saved to {activations_path}")
 
-        # Final flush to ensure all data is written
-        feature_registry.flush()
-        print(f"Feature registry saved to {feature_registry_path}")
-
-    # Load feature registry using memory-mapping
     print(f"Loading feature registry from {feature_registry_path}")
-    feature_registry = np.memmap(
-        feature_registry_path,
-        dtype="float32",
-        mode="r",
-        shape=(n_feature_activations, n),
-    )
-
-
-    top_activating_features = list(range(feature_registry.shape[0]))
-    top_activating_features.sort(key = lambda i: np.sum(feature_registry[i] > 0), reverse=True)
-    top_feature_registry = [feature_registry[i] for i in top_activating_features]
-
-    count = 0
-    progress_bar = tqdm.tqdm(top_activating_features, desc="Processing features")
-    for index in progress_bar:
-        feature = feature_registry[index]
-
-        # Get all the features 
-        feature_samples = [
-            FeatureSample(text=text_data[i], act=value)
-            for i, value in enumerate(feature)
-        ]
-
-        # Filter out all the feature samples where the text property is the same
-        feature_samples = list(set(feature_samples))
+    with np.load(feature_registry_path) as feature_registry:
+        top_acts = feature_registry["top_acts"]
+        top_idx = feature_registry["top_idx"]
+        zero_idx = feature_registry["zero_idx"]
+        non_zero_counts = feature_registry["non_zero_counts"]
+        n = int(feature_registry["n_samples"])
+        feature_indices = feature_registry["feature_indices"]
+
+    # Near-dead and near-dense features give uninformative labels, so drop them
+    # before spending any OpenAI calls on them
+    densities = non_zero_counts / n
+    active = (densities > min_density) & (densities < max_density) & (top_acts[:, 0] > 0)
+    print(f"Skipping {len(active) - active.sum()} of {len(active)} features by density")
+
+    top_activating_features = np.argsort(-non_zero_counts, kind="stable")
+    top_activating_features = top_activating_features[active[top_activating_features]]
+
+    n_to_label = len(top_activating_features)
+    if world_size > 1:
+        global_ranking = _global_feature_ranking(
+            feature_indices[top_activating_features],
+            non_zero_counts[top_activating_features],
+        )
+        if max_features is not None:
+            # This rank's share of the top max_features across all ranks. Its own
+            # ranking is a subsequence of the global one, so these come first
+            n_to_label = int(
+                np.isin(
+                    feature_indices[top_activating_features],
+                    global_ranking[:max_features],
+                ).sum()
+            )
+    elif max_features is not None:
+        n_to_label = min(n_to_label, max_features)
+    labelled_features = []
+    progress_bar = tqdm.tqdm(total=n_to_label, desc="Labelling features")
 
+    def label_feature(index):
         # Get high activation samples
-        high_act_samples = nlargest(
-            k,
-            (sample for sample in feature_samples if sample.act > 0),
-            key=lambda x: x.act,
-        )
+        high_act_samples = [
+            FeatureSample(text=text_data[i], act=act)
+            for act, i in zip(
+                top_acts[index, :k].tolist(), top_idx[index, :k].tolist()
+            )
+            if i >= 0
+        ]
 
         # Only consider non-dead features
         if len(high_act_samples) == 0:
-            continue
+            return None
 
         # Get low activation samples
-        low_act_samples_population = [
-            sample for sample in feature_samples if sample.act == 0
+        low_act_samples = [
+            FeatureSample(text=text_data[i], act=0.0)
+            for i in zero_idx[index, :k].tolist()
+            if i >= 0
         ]
-        num_low_act_samples = min(k, len(low_act_samples_population))
-        low_act_samples = np.random.choice(
-            low_act_samples_population, num_low_act_samples, replace=False
-        ).tolist()
 
         try:
             interpetation = ai.get_interpretation(
@@ -179,54 +500,126 @@ def run_interp_pipeline(
             reasoning = interpetation["reasoning"]
             attributes = interpetation["attributes"]
 
-            high_act_score = ai.score_interpretation(high_act_samples, attributes)[
-                "percent"
-            ]
-            low_act_score = ai.score_interpretation(low_act_samples, attributes)[
-                "percent"
-            ]            
+            # Both scores only depend on the interpretation, so request them together
+            low_act_score = executor.submit(
+                ai.score_interpretation, low_act_samples, attributes
+            )
+            high_act_score = ai.score_interpretation(high_act_samples, attributes)
+            high_act_score = high_act_score["percent"]
+            low_act_score = low_act_score.result()["percent"]
         except Exception as e:
             print(f"Skipping feature due to error: {e}")
-            continue
+            return None
 
-        labelled_feature = Feature(
-            index=index,
+        return Feature(
+            index=int(feature_indices[index]),
             label=label,
             attributes=attributes,
             reasoning=reasoning,
             confidence=abs(high_act_score - low_act_score),
-            density=(np.count_nonzero(feature) / len(feature)),
+            density=float(densities[index]),
             high_act_samples=high_act_samples,
             low_act_samples=low_act_samples,
         )
-        count += 1
-        if max_features is not None and count > max_features:
-            break
-
-        handle_labelled_feature(labelled_feature)
 
-    # Manually finish the progress bar if we break early
-    progress_bar.close()
-
-
-def plot_feature_activation_histogram(model, mini_pile_dataset, num_samples=1000):
-    # Initialize a dictionary to count non-zero activations for each feature
-    feature_non_zero_count = defaultdict(int)
+    def handle_in_order(labelled_feature):
+        if world_size == 1:
+            handle_labelled_feature(labelled_feature)
+        else:
+            labelled_features.append(labelled_feature)
+
+    def process_features():
+        # Work down the ranked features, keeping at most `concurrency` of them in
+        # flight and never more than are still needed to reach max_features. A
+        # feature that fails frees its slot for the next one in the ranking.
+        ranked = enumerate(top_activating_features)
+        running = {}  # future -> rank position
+        finished = {}  # rank position -> Feature, or None if it failed
+        next_position = 0
+        n_labelled = 0
+
+        while True:
+            while (
+                len(running) < concurrency
+                and n_labelled + len(running) < n_to_label
+            ):
+                position, index = next(ranked, (None, None))
+                if position is None:
+                    break
+                running[executor.submit(label_feature, index)] = position
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                labelled_feature = future.result()
+                finished[running.pop(future)] = labelled_feature
+                if labelled_feature is not None:
+                    n_labelled += 1
+                    progress_bar.update(1)
+
+            # Hand features back in rank order, not completion order
+            while next_position in finished:
+                labelled_feature = finished.pop(next_position)
+                if labelled_feature is not None:
+                    handle_in_order(labelled_feature)
+                next_position += 1
+
+    # Every call blocks, so plain threads do the work; unlike an event loop this
+    # also runs inside notebooks, which already have a loop running. Each feature
+    # holds one thread and can have both of its scoring requests in flight at once
+    max_requests = 2 * concurrency
+    ai = OpenAIClient(openai_api_key, model=model, max_connections=max_requests)
+    try:
+        with ThreadPoolExecutor(max_workers=max_requests) as executor:
+            process_features()
+    finally:
+        ai.close()
+        progress_bar.close()
+
+    if world_size > 1:
+        # Only rank 0 hands features back so callers don't need to be rank-aware
+        gathered = [None] * world_size
+        dist.all_gather_object(gathered, labelled_features)
+        if rank == 0:
+            position = {index: i for i, index in enumerate(global_ranking.tolist())}
+            for labelled_feature in sorted(
+                (f for rank_features in gathered for f in rank_features),
+                key=lambda f: position[f.index],
+            ):
+                handle_labelled_feature(labelled_feature)
+
+
+def plot_feature_activation_histogram(
+    model,
+    mini_pile_dataset,
+    num_samples=1000,
+    device=None,
+    batch_size=4096,
+    num_workers=4,
+    compile_sae=False,
+):
     num_samples = min(num_samples, len(mini_pile_dataset.embeddings))
 
+    if device is None:
+        device = _default_device()
+
     # Count non-zero activations for each feature across samples
-    for sample_idx in range(num_samples):
-        embedding = torch.tensor(mini_pile_dataset.embeddings[sample_idx])
-        feature_activations = model.forward(embedding)[1]
-        non_zero_indices = torch.nonzero(feature_activations, as_tuple=True)[0]
-        for idx in non_zero_indices:
-            feature_non_zero_count[idx.item()] += 1
+    non_zero_counts = 0
+    for _, _, feature_activations in _iter_feature_activations(
+        model,
+        mini_pile_dataset.embeddings[:num_samples],
+        batch_size,
+        device,
+        num_workers,
+        compile_sae,
+    ):
+        non_zero_counts += (feature_activations != 0).sum(dim=0)
+    non_zero_counts = non_zero_counts.cpu().numpy()
 
     # Plotting the histogram
     plt.figure(figsize=(10, 6))
-    plt.bar(
-        feature_non_zero_count.keys(), feature_non_zero_count.values(), color="skyblue"
-    )
+    plt.bar(np.arange(len(non_zero_counts)), non_zero_counts, color="skyblue")
     plt.xlabel("Feature Index", fontsize=14)
     plt.ylabel("Non-Zero Count", fontsize=14)
     plt.title(f"Feature Non-Zero Count for first {num_samples} samples", fontsize=16)
@@ -234,23 +627,36 @@ def plot_feature_activation_histogram(model, mini_pile_dataset, num_samples=1000
     plt.show()
 
 
-def count_non_zero_feature_activations(model, mini_pile_dataset, num_samples=100):
-    total_non_zero = 0
-    total_elements = 0
-    percent_count = 0
+def count_non_zero_feature_activations(
+    model,
+    mini_pile_dataset,
+    num_samples=100,
+    device=None,
+    batch_size=4096,
+    num_workers=4,
+    compile_sae=False,
+):
     num_samples = min(num_samples, len(mini_pile_dataset.embeddings))
 
-    for sample_idx in range(num_samples):
-        embedding = torch.tensor(mini_pile_dataset.embeddings[sample_idx])
-        feature_activations = model.forward(embedding)[1]
-        non_zero_elements = torch.count_nonzero(feature_activations)
-        total_non_zero += non_zero_elements
-        total_elements += feature_activations.numel()
-
-        percent_count += non_zero_elements / feature_activations.numel()
+    if device is None:
+        device = _default_device()
 
-    average_non_zero = total_non_zero / num_samples
-    percentage_non_zero = (percent_count / num_samples) * 100
+    n_features = None
+    non_zero_elements = []
+    for _, _, feature_activations in _iter_feature_activations(
+        model,
+        mini_pile_dataset.embeddings[:num_samples],
+        batch_size,
+        device,
+        num_workers,
+        compile_sae,
+    ):
+        n_features = feature_activations.shape[1]
+        non_zero_elements.append(torch.count_nonzero(feature_activations, dim=1))
+    non_zero_elements = torch.cat(non_zero_elements)
+
+    average_non_zero = non_zero_elements.float().mean().item()
+    percentage_non_zero = (non_zero_elements / n_features).mean().item() * 100
 
     print(
         f"Average Non-Zero Elements for first {num_samples} samples: {average_non_zero}"
@@ -284,78 +690,92 @@ def plot_highest_activating_feature_for_each_sentence(
     fine_tuned_features,
     comparison_heatmap_data=None,
     comparison_features=None,
+    output_file=None,
+    sentences_per_figure=10,
 ):
     print("Analyzing feature activations for each sentence:")
     print("=" * 80)
 
-    for idx, entry in enumerate(fine_tuned_heatmap_data):
-        print(f"\nSentence {idx + 1}: {entry['sentence']}")
-        print("-" * 80)
-
-        # Create a figure with two subplots side by side
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(20, 5))
-
-        # Function to plot and print feature information
-        def plot_and_print_features(ax, heatmap_data, features, title):
-            activations = heatmap_data[idx]["feature_activations"]
-            top_5_indices = sorted(
-                range(len(activations)), key=lambda i: activations[i], reverse=True
-            )[:5]
-            top_5_activations = [activations[i] for i in top_5_indices]
-            top_5_labels = []
-            for feature_idx in top_5_indices:
-                matching_feature = next(
-                    (f for f in features if f.index == feature_idx), None
-                )
-                label = (
-                    matching_feature.label
-                    if matching_feature
-                    else f"Feature {feature_idx}"
-                )
-                top_5_labels.append(label)
-
-            y_pos = np.arange(len(top_5_labels))
-            ax.barh(y_pos, top_5_activations)
-            ax.set_yticks(y_pos)
-            ax.set_yticklabels(top_5_labels)
-            ax.set_title(title)
-            ax.set_xlabel("Activation Strength")
-            ax.set_ylabel("Feature Label")
-            ax.set_xlim(0, 1)
-
-            for i, v in enumerate(top_5_activations):
-                ax.text(v, i, f" {v:.4f}", va="center")
-
-            print(f"Top 5 activating features for {title}:")
-            for feature_idx, activation in zip(top_5_indices, top_5_activations):
-                matching_feature = next(
-                    (f for f in features if f.index == feature_idx), None
-                )
-                if matching_feature:
-                    print(
-                        f"  Feature {feature_idx:4d} | Activation: {activation:.4f} | Label: {matching_feature.label}"
-                    )
-                else:
-                    print(
-                        f"  Feature {feature_idx:4d} | Activation: {activation:.4f} | Label: N/A"
-                    )
-            print()
-
-        # Plot and print for fine-tuned model
-        plot_and_print_features(
-            ax1, fine_tuned_heatmap_data, fine_tuned_features, "Fine-tuned Model"
+    # Look feature labels up by index instead of scanning the feature list
+    fine_tuned_labels = {f.index: f.label for f in fine_tuned_features}
+    comparison_labels = {f.index: f.label for f in comparison_features or []}
+
+    # Sentences are drawn in pages of sentences_per_figure rows, each row holding
+    # the two models' subplots, so a figure never grows with the number of sentences
+    n_sentences = len(fine_tuned_heatmap_data)
+    n_pages = -(-n_sentences // sentences_per_figure)
+    for page, page_start in enumerate(range(0, n_sentences, sentences_per_figure)):
+        page_entries = fine_tuned_heatmap_data[
+            page_start : page_start + sentences_per_figure
+        ]
+        fig, axes = plt.subplots(
+            len(page_entries), 2, figsize=(20, 5 * len(page_entries)), squeeze=False
         )
 
-        # Plot and print for comparison model if provided
-        if comparison_heatmap_data and comparison_features:
+        for idx, entry, (ax1, ax2) in zip(
+            range(page_start, n_sentences), page_entries, axes
+        ):
+            print(f"\nSentence {idx + 1}: {entry['sentence']}")
+            print("-" * 80)
+
+            # Function to plot and print feature information
+            def plot_and_print_features(ax, heatmap_data, labels, title):
+                activations = np.asarray(heatmap_data[idx]["feature_activations"])
+                num_top = min(5, activations.size)
+                top_5_indices = np.argpartition(activations, -num_top)[-num_top:]
+                top_5_indices = top_5_indices[np.argsort(-activations[top_5_indices])]
+                top_5_activations = activations[top_5_indices]
+                top_5_labels = [
+                    labels.get(feature_idx, f"Feature {feature_idx}")
+                    for feature_idx in top_5_indices
+                ]
+
+                y_pos = np.arange(len(top_5_labels))
+                ax.barh(y_pos, top_5_activations)
+                ax.set_yticks(y_pos)
+                ax.set_yticklabels(top_5_labels)
+                ax.set_title(f"Sentence {idx + 1}: {title}")
+                ax.set_xlabel("Activation Strength")
+                ax.set_ylabel("Feature Label")
+                ax.set_xlim(0, 1)
+
+                for i, v in enumerate(top_5_activations):
+                    ax.text(v, i, f" {v:.4f}", va="center")
+
+                print(f"Top 5 activating features for {title}:")
+                for feature_idx, activation in zip(top_5_indices, top_5_activations):
+                    if feature_idx in labels:
+                        print(
+                            f"  Feature {feature_idx:4d} | Activation: {activation:.4f} | Label: {labels[feature_idx]}"
+                        )
+                    else:
+                        print(
+                            f"  Feature {feature_idx:4d} | Activation: {activation:.4f} | Label: N/A"
+                        )
+                print()
+
+            # Plot and print for fine-tuned model
             plot_and_print_features(
-                ax2, comparison_heatmap_data, comparison_features, "Pre-Trained Model"
+                ax1, fine_tuned_heatmap_data, fine_tuned_labels, "Fine-tuned Model"
             )
-        else:
-            ax2.axis("off")
+
+            # Plot and print for comparison model if provided
+            if comparison_heatmap_data and comparison_features:
+                plot_and_print_features(
+                    ax2, comparison_heatmap_data, comparison_labels, "Pre-Trained Model"
+                )
+            else:
+                ax2.axis("off")
 
         plt.tight_layout()
+        if output_file:
+            if n_pages > 1:
+                root, ext = os.path.splitext(output_file)
+                fig.savefig(f"{root}_{page + 1}{ext}")
+            else:
+                fig.savefig(output_file)
         plt.show()
+        plt.close(fig)
 
     print("=" * 80)
     print("Analysis complete.")
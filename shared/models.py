@@ -1,5 +1,7 @@
+import mmap
 from torch.utils.data import Dataset
 import numpy as np
+import torch
 import pandas as pd
 
 
@@ -20,4 +22,44 @@ class MiniPileDataset(Dataset):
         return len(self.embeddings)
 
     def __getitem__(self, idx):
-        return self.sentences[idx], self.embeddings[idx]
+        # Embeddings may be stored in half precision on disk
+        return self.sentences[idx], np.asarray(self.embeddings[idx], dtype=np.float32)
+
+
+class EmbeddingBatches(Dataset):
+    """Contiguous float32 batches of embeddings, meant for a DataLoader with batch_size=None."""
+
+    def __init__(self, embeddings, batch_size):
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+
+    def __len__(self):
+        return -(-len(self.embeddings) // self.batch_size)
+
+    def __getitem__(self, idx):
+        start = idx * self.batch_size
+        batch = self.embeddings[start : start + self.batch_size]
+        return torch.from_numpy(np.array(batch, dtype=np.float32))
+
+    def __getstate__(self):
+        # Reopen memory-mapped embeddings in worker processes instead of pickling
+        # them; views of a memmap don't carry their own offset, so those are copied
+        state = self.__dict__.copy()
+        embeddings = self.embeddings
+        if isinstance(embeddings, np.memmap) and isinstance(embeddings.base, mmap.mmap):
+            state["embeddings"] = (
+                embeddings.filename,
+                embeddings.offset,
+                embeddings.dtype,
+                embeddings.shape,
+                "F" if np.isfortran(embeddings) else "C",
+            )
+        return state
+
+    def __setstate__(self, state):
+        if isinstance(state["embeddings"], tuple):
+            filename, offset, dtype, shape, order = state["embeddings"]
+            state["embeddings"] = np.memmap(
+                filename, dtype=dtype, mode="r", offset=offset, shape=shape, order=order
+            )
+        self.__dict__.update(state)
@@ -80,8 +80,9 @@ def sae_featurize_data(data, sae, output_file='feature_registry.npy'):
     for i, (sentence, embedding) in enumerate(progress_bar(zip(data.sentences, data.embeddings), 
                                                          total=n_examples, 
                                                          desc="Featurizing data")):
-        # Convert embedding to tensor
-        embedding = torch.tensor(embedding).to("cuda:0")
+        # Cast one row at a time, so memory-mapped float16 embeddings are never
+        # copied into RAM as a whole
+        embedding = torch.from_numpy(np.asarray(embedding, dtype=np.float32)).to("cuda:0")
         
         # Get feature activations from SAE
         with torch.no_grad():
@@ -129,6 +129,27 @@ class SparseAutoencoder(nn.Module, PyTorchModelHubMixin):
         acts = buf.scatter_(dim=-1, index=top_indices, src=top_acts)
         return acts
 
+    def select_features(self, indices) -> "SparseAutoencoder":
+        """Return a smaller SAE whose features are `indices` of this one.
+
+        Only basic SAEs can be split this way: each ReLU feature depends on its own
+        encoder row, whereas TopK activations depend on every feature.
+        """
+        if self.config.sae_type != SparseAutoencoderType.BASIC:
+            raise NotImplementedError("Only basic SAEs can be split by feature")
+
+        indices = torch.as_tensor(indices, device=self.enc_bias.device)
+        config = self.config.model_copy(
+            update={"d_sparse": len(indices), "tie_weights": False}
+        )
+        sae = SparseAutoencoder(config).to(self.enc_bias.device)
+        with torch.no_grad():
+            sae.enc_bias.copy_(self.enc_bias[indices])
+            sae.encoder.weight.copy_(self.encoder.weight[indices])
+            sae.dec_bias.copy_(self.dec_bias)
+            sae.decoder.weight.copy_(self.decoder.weight[:, indices])
+        return sae
+
     def load(self, path: os.PathLike, device: torch.device = "cpu"):
         self.load_state_dict(torch.load(path, map_location=device))
 
@@ -83,11 +83,13 @@ def build_heatmap_using_encoder_method(
         embeddings.append(embedding)
 
     # 3. Get feature activations
+    # Run every sentence through the SAE in a single batch
     feature_activations = []
-    for embedding in embeddings:
-        embedding_tensor = torch.tensor(embedding)
-        activation = sae_model.forward(embedding_tensor)[1]
-        feature_activations.append(activation[:first_n_features].tolist())
+    if embeddings:
+        embeddings_tensor = torch.tensor(embeddings, dtype=torch.float32)
+        feature_activations = sae_model.forward(embeddings_tensor)[1][
+            :, :first_n_features
+        ].tolist()
 
     # 4. Write to JSON file
     output = []